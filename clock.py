@@ -3,12 +3,18 @@
 # Generates a 44-second MP4 video of a binary clock showing 4:44 using BCD columns: [0, 4, 4, 4].
 # Layout: Each digit column has 4 LEDs for bits [8,4,2,1] from top to bottom.
 
-import math
+import functools
+import mmap
 import os
+import shutil
+import subprocess
 import requests  # pip install requests
-from typing import List, Tuple
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
 
-import imageio.v2 as imageio    # pip install imageio imageio-ffmpeg
+import imageio_ffmpeg           # pip install imageio-ffmpeg
 import numpy as np              # pip install numpy
 from PIL import Image, ImageDraw, ImageFont  # pip install pillow
 
@@ -33,6 +39,7 @@ GRID_CENTER = (WIDTH // 2, HEIGHT // 2 - 40)
 PULSE_ENABLED = True
 PULSE_FREQ = 0.25      # Hz (cycles per second)
 PULSE_DEPTH = 0.25     # 0..1 fraction to modulate brightness
+PULSE_LEVELS = 16      # brightness steps the pulse is quantized to (LED layers are cached per step)
 
 # Blinking colon
 COLON_ENABLED = True
@@ -47,17 +54,35 @@ CODE_OVERLAY_OPACITY = 0.4  # 0.0-1.0 transparency
 CODE_FONT_SIZE = 28
 CODE_LINE_HEIGHT = 32
 CODE_COLOR = (150, 255, 150)  # Code color (light green)
+CODE_LINES_PER_SCREEN = 25  # Show about 25 lines at once
+CODE_START_X, CODE_START_Y = 400, 100  # Position over clock area
+# Color with opacity applied (the overlay background matches the canvas, so it is pre-blended)
+CODE_OVERLAY_COLOR = tuple(int(c * CODE_OVERLAY_OPACITY) for c in CODE_COLOR)
 
 OUTPUT_MP4 = "binary_clock_4_44.mp4"
+VIDEO_CRF = 10  # constant quality level (0-51, lower is better), mapped onto each encoder's own option
+VIDEO_ENCODER = None  # force one of H264_ENCODERS (e.g. "libx264"); None probes for hardware encoders
+
+# H.264 encoders in order of preference, with their quality/preset arguments
+H264_ENCODERS = [
+    ("h264_nvenc", ["-preset", "p4", "-tune", "ll", "-rc", "vbr", "-cq", str(VIDEO_CRF), "-b:v", "0",
+                    "-pix_fmt", "yuv420p"]),
+    ("h264_qsv", ["-global_quality", str(VIDEO_CRF), "-pix_fmt", "nv12"]),
+    ("h264_vaapi", ["-vaapi_device", "/dev/dri/renderD128", "-vf", "format=nv12,hwupload", "-qp", str(VIDEO_CRF)]),
+    ("libx264", ["-preset", "veryfast", "-crf", str(VIDEO_CRF), "-pix_fmt", "yuv420p"]),
+]
 
 
 # ----------------------------
 # Binary Clock Logic (BCD)
 # ----------------------------
-def bcd_bits(d: int) -> List[int]:
+# BCD bits [8,4,2,1] (top->bottom) for every decimal digit, computed once at import
+_BCD_BITS = tuple(tuple((d >> shift) & 1 for shift in (3, 2, 1, 0)) for d in range(10))
+
+
+def bcd_bits(d: int) -> Tuple[int, ...]:
     """Return 4-bit BCD bits [8,4,2,1] for digit d, top to bottom."""
-    assert 0 <= d <= 9
-    return [(d >> shift) & 1 for shift in (3, 2, 1, 0)]  # 8,4,2,1 (top->bottom)
+    return _BCD_BITS[d]
 
 
 def digits_for_time(h: int, m: int) -> List[int]:
@@ -83,57 +108,106 @@ def lerp_color(c1: Tuple[int, int, int], c2: Tuple[int, int, int], t: float) ->
     return tuple(int(c1[i] + (c2[i] - c1[i]) * t) for i in range(3))
 
 
+# LED state of one frame: (digits, quantized pulse level, colon on)
+FrameKey = Tuple[Tuple[int, ...], int, bool]
+
+
 # ----------------------------
 # Rendering Helpers
 # ----------------------------
-def draw_led(draw: ImageDraw.ImageDraw, cx: int, cy: int, r: int, color: Tuple[int, int, int]):
-    """Draw a circular LED."""
-    bbox = [cx - r, cy - r, cx + r, cy + r]
-    draw.ellipse(bbox, fill=color)
+def make_disk(r: int) -> np.ndarray:
+    """Return a (2r+1, 2r+1) boolean mask of a filled disk with radius r."""
+    y, x = np.ogrid[-r:r + 1, -r:r + 1]
+    # Test against the outer pixel edge; this approximates ImageDraw.ellipse's outline
+    # (a few rim pixels per disk differ)
+    return x * x + y * y <= (r + 0.5) ** 2
+
+
+# Pre-rasterized LED sprites, stamped into the canvas with slice assignment
+LED_SPRITE = make_disk(LED_RADIUS)
+COLON_SPRITE = make_disk(COLON_RADIUS)
+
+# LED color indexed by bit value (0 = off, 1 = on)
+LED_BASE_COLORS = np.array([LED_OFF, LED_ON], np.float32)
+
+
+def pack_rgb(colors) -> np.ndarray:
+    """Pack (..., 3) RGB values into uint32 pixels whose bytes in memory are R, G, B, 255 (ffmpeg rgba)."""
+    colors = np.asarray(colors, np.uint8)
+    rgba = np.empty(colors.shape[:-1] + (4,), np.uint8)
+    rgba[..., :3] = colors
+    rgba[..., 3] = 255
+    return rgba.view(np.uint32)[..., 0]
+
+
+# Frames are (HEIGHT, WIDTH) uint32 canvases holding one packed RGBA pixel per element
+BACKGROUND_PX = pack_rgb(BACKGROUND)
+
+
+def blit_led(canvas: np.ndarray, cx: int, cy: int, sprite: np.ndarray, color: int):
+    """Stamp a circular LED sprite centered at (cx, cy) into the canvas."""
+    r = sprite.shape[0] // 2
+    canvas[cy - r:cy + r + 1, cx - r:cx + r + 1][sprite] = color
+
 
+def _fill_disks(layer: np.ndarray, centers: np.ndarray, radii: np.ndarray, colors: np.ndarray):
+    """Fill disk i (center centers[i], radius radii[i]) with colors[i] by stamping sprites."""
+    for (cx, cy), r, color in zip(centers, radii, colors):
+        sprite = LED_SPRITE if r == LED_RADIUS else COLON_SPRITE if r == COLON_RADIUS else make_disk(r)
+        blit_led(layer, cx, cy, sprite, color)
 
-def compute_grid_positions() -> List[List[Tuple[int, int]]]:
-    """Compute (x,y) positions for a 4x4 grid centered around GRID_CENTER."""
+
+def compute_grid_positions() -> np.ndarray:
+    """Compute a (GRID_COLS, GRID_ROWS, 2) int32 array of (x,y) positions for a 4x4 grid centered around GRID_CENTER."""
     cx, cy = GRID_CENTER
     total_w = COLUMN_SPACING * (GRID_COLS - 1)
     total_h = ROW_SPACING * (GRID_ROWS - 1)
-    left = cx - total_w // 2
-    top = cy - total_h // 2
-
-    positions = []
-    for col in range(GRID_COLS):
-        col_x = left + col * COLUMN_SPACING
-        column_positions = []
-        for row in range(GRID_ROWS):
-            row_y = top + row * ROW_SPACING
-            column_positions.append((col_x, row_y))
-        positions.append(column_positions)
-    return positions
-
-
-def pulse_factor(t: float) -> float:
-    """Return brightness multiplier in [1-PULSE_DEPTH, 1+PULSE_DEPTH] over time."""
+    cols = np.arange(GRID_COLS) * COLUMN_SPACING + (cx - total_w // 2)
+    rows = np.arange(GRID_ROWS) * ROW_SPACING + (cy - total_h // 2)
+    return np.stack(np.broadcast_arrays(cols[:, None], rows[None, :]), axis=-1).astype(np.int32)
+
+
+def pulse_factor(t: np.ndarray) -> np.ndarray:
+    """Return brightness multipliers in [1-PULSE_DEPTH, 1+PULSE_DEPTH] for an array of times."""
     if not PULSE_ENABLED:
-        return 1.0
+        return np.ones_like(t)
     # sine wave centered at 1.0, amplitude PULSE_DEPTH
-    return 1.0 + PULSE_DEPTH * math.sin(2 * math.pi * PULSE_FREQ * t)
+    return 1.0 + PULSE_DEPTH * np.sin(2 * np.pi * PULSE_FREQ * t)
 
 
-def modulate_brightness(color: Tuple[int, int, int], k: float) -> Tuple[int, int, int]:
-    """Scale color brightness by k (clamped)."""
-    k = max(0.0, min(2.0, k))
-    return tuple(int(max(0, min(255, ch * k))) for ch in color)
+def _pulse_quantized() -> bool:
+    """Return True if the pulse spans more than one brightness level."""
+    return PULSE_ENABLED and PULSE_DEPTH > 0 and PULSE_LEVELS > 1
 
 
-def colon_visible(t: float) -> bool:
-    """Return True if colon should be visible at time t (blinking every second)."""
+def quantize_pulse(k: np.ndarray) -> np.ndarray:
+    """Return the index of the PULSE_LEVELS step closest to each pulse factor in k."""
+    if not _pulse_quantized():
+        return np.zeros(np.shape(k), np.int64)  # a single level, k = 1.0
+    step = 2 * PULSE_DEPTH / (PULSE_LEVELS - 1)
+    level = np.rint((k - (1.0 - PULSE_DEPTH)) / step)
+    return np.clip(level, 0, PULSE_LEVELS - 1).astype(np.int64)
+
+
+def pulse_level(level: int) -> float:
+    """Return the pulse factor for a quantized level index."""
+    if not _pulse_quantized():
+        return 1.0
+    step = 2 * PULSE_DEPTH / (PULSE_LEVELS - 1)
+    return (1.0 - PULSE_DEPTH) + level * step
+
+
+def colon_visible(frame: np.ndarray) -> np.ndarray:
+    """Return a boolean array, True for the frame indices where the colon is visible (blinking every second)."""
     if not COLON_ENABLED:
-        return False
-    # Blink on/off every second
-    cycle_time = 1.0 / COLON_BLINK_FREQ
-    return (t % cycle_time) < (cycle_time / 2)
+        return np.zeros(frame.shape, bool)
+    # On for the first half of each blink period, off for the second half: count
+    # elapsed half periods in frames so any FPS / COLON_BLINK_FREQ ratio stays exact
+    half_periods = np.floor(frame * (2 * COLON_BLINK_FREQ) / FPS).astype(np.int64)
+    return (half_periods & 1) == 0
 
 
+@functools.lru_cache(maxsize=None)
 def download_font():
     """Download a monospace font if not already present."""
     font_path = "DejaVuSansMono.ttf"
@@ -158,123 +232,432 @@ def download_font():
         return None
 
 
-def load_source_code() -> List[str]:
-    """Load the source code as individual lines."""
+def index_lines(source: Union[mmap.mmap, bytes]) -> List[int]:
+    """Return the start offset of every line in source, plus one past the end of the last line."""
+    offsets = [0]
+    while (newline := source.find(b"\n", offsets[-1])) != -1:
+        offsets.append(newline + 1)
+    if offsets[-1] != len(source):
+        offsets.append(len(source) + 1)  # last line has no trailing newline
+    return offsets
+
+
+def source_line(source: Union[mmap.mmap, bytes], offsets: List[int], i: int) -> str:
+    """Return line i of source (without its line ending) using the offsets from index_lines."""
+    return source[offsets[i]:offsets[i + 1] - 1].decode('utf-8', 'replace').rstrip()
+
+
+def load_source_code() -> Tuple[Union[mmap.mmap, bytes], List[int]]:
+    """Map the source code read-only and index where each line starts."""
     try:
-        with open(__file__, 'r', encoding='utf-8') as f:
-            return [line.rstrip() for line in f.readlines()]
+        with open(__file__, 'rb') as f:
+            source = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
     except:
-        return ["# Code overlay unavailable"]
+        source = b"# Code overlay unavailable"
+    return source, index_lines(source)
 
 
-def draw_code_overlay(draw: ImageDraw.ImageDraw, source_lines: List[str], t: float):
-    """Draw scrolling code overlay."""
-    if not CODE_OVERLAY_ENABLED or not source_lines:
-        return
-    
-    # Calculate scroll speed to get through entire script in 44 seconds
-    lines_per_screen = 25  # Show about 25 lines at once
-    total_scrollable_lines = max(1, len(source_lines) - lines_per_screen + 1)
-    lines_per_second = total_scrollable_lines / DURATION_SEC  # Get through all lines in 44 seconds
-    
-    # Calculate current starting line
-    start_line = int(t * lines_per_second) % total_scrollable_lines
-    end_line = min(start_line + lines_per_screen, len(source_lines))
-    
-    # Position over clock area
-    start_y = 100
-    start_x = 400
-    
+@functools.lru_cache(maxsize=None)
+def get_font() -> Union[ImageFont.FreeTypeFont, ImageFont.ImageFont]:
+    """Load the code overlay font once, falling back to consolas or the PIL default."""
     # Try to load a monospace font with the specified size
-    font = None
     try:
         font_path = download_font()
         if font_path:
-            font = ImageFont.truetype(font_path, CODE_FONT_SIZE)
+            return ImageFont.truetype(font_path, CODE_FONT_SIZE)
     except:
         pass
-    
-    if not font:
-        try:
-            font = ImageFont.truetype("consolas.ttf", CODE_FONT_SIZE)
-        except:
-            font = ImageFont.load_default()
-    
-    # Apply color with opacity
-    color = tuple(int(c * CODE_OVERLAY_OPACITY) for c in CODE_COLOR)
-    
-    for i, line_idx in enumerate(range(start_line, end_line)):
-        if line_idx < len(source_lines):
-            line = source_lines[line_idx]
-            # Trim long lines
-            display_line = line[:120] if len(line) > 120 else line
-            y = start_y + i * CODE_LINE_HEIGHT
-            
-            try:
-                draw.text((start_x, y), display_line, fill=color, font=font)
-            except:
-                # Fallback if text rendering fails
-                draw.text((start_x, y), "[code]", fill=color)
-
-
-def render_frame(t: float, positions: List[List[Tuple[int, int]]], source_lines: List[str]) -> Image.Image:
-    """Render one frame at time t (seconds)."""
-    # Get current time based on elapsed seconds
-    hour, minute = get_time_for_elapsed(t)
-    digits = digits_for_time(hour, minute)
-    
-    img = Image.new("RGB", (WIDTH, HEIGHT), BACKGROUND)
+
+    try:
+        return ImageFont.truetype("consolas.ttf", CODE_FONT_SIZE)
+    except:
+        return ImageFont.load_default()
+
+
+def rasterize_code_strip(source: Union[mmap.mmap, bytes], offsets: List[int],
+                         font: Union[ImageFont.FreeTypeFont, ImageFont.ImageFont]) -> Tuple[np.ndarray, np.ndarray]:
+    """Render every source line once into a tall (lines * CODE_LINE_HEIGHT, width) packed uint32 strip.
+
+    Glyphs may overhang their line by a few rows into the next one, which a frame
+    showing only some of the lines doesn't draw. So the strip comes with a
+    (lines, 2, overhang, width) array of each line drawn alone: its first
+    `overhang` rows, and the `overhang` rows below it.
+    """
+    num_lines = len(offsets) - 1
+    code_width = WIDTH - CODE_START_X
+    img = Image.new("RGBA", (code_width, num_lines * CODE_LINE_HEIGHT), BACKGROUND + (255,))
     draw = ImageDraw.Draw(img)
+    color = CODE_OVERLAY_COLOR + (255,)
+    # Trim long lines
+    trimmed_lines = [source_line(source, offsets, i)[:120] for i in range(num_lines)]
+
+    for line_idx, line in enumerate(trimmed_lines):
+        draw.text((0, line_idx * CODE_LINE_HEIGHT), line, fill=color, font=font)
+
+    # RGBA bytes viewed as one uint32 per pixel, the same layout as the canvas
+    strip = np.asarray(img).view(np.uint32)[..., 0]
+
+    # Rows at a line boundary only need splitting when ink from both lines meets
+    # there; otherwise they belong to whichever side has ink. So a line is drawn
+    # again on its own only in that case (or for the last line's overhang)
+    boxes = [draw.textbbox((0, 0), line, font=font) if line else None for line in trimmed_lines]
+    overhang = max([box[3] - CODE_LINE_HEIGHT for box in boxes if box] + [0])
+    inked_head = [box is not None and box[1] < overhang for box in boxes]
+    inked_tail = [box is not None and box[3] > CODE_LINE_HEIGHT for box in boxes]
+    edges = np.full((num_lines, 2, overhang, code_width), BACKGROUND_PX, np.uint32)
+    line_img = Image.new("RGBA", (code_width, CODE_LINE_HEIGHT + overhang))
+    line_draw = ImageDraw.Draw(line_img)
+
+    def draw_alone(line_idx: int) -> np.ndarray:
+        line_img.paste(BACKGROUND + (255,), (0, 0) + line_img.size)
+        line_draw.text((0, 0), trimmed_lines[line_idx], fill=color, font=font)
+        return np.asarray(line_img).view(np.uint32)[..., 0]
+
+    for line_idx in range(num_lines):
+        top = line_idx * CODE_LINE_HEIGHT
+        bottom = top + CODE_LINE_HEIGHT
+        if inked_head[line_idx]:
+            if line_idx > 0 and inked_tail[line_idx - 1]:
+                edges[line_idx, 0] = draw_alone(line_idx)[:overhang]
+            else:
+                edges[line_idx, 0] = strip[top:top + overhang]
+        if inked_tail[line_idx]:
+            if line_idx + 1 == num_lines or inked_head[line_idx + 1]:
+                edges[line_idx, 1] = draw_alone(line_idx)[CODE_LINE_HEIGHT:]
+            else:
+                edges[line_idx, 1] = strip[bottom:bottom + overhang]
+
+    return strip, edges
+
+
+def code_scroll_line(t: float, num_lines: int) -> int:
+    """Return the first source line shown by the code overlay at time t."""
+    # Calculate scroll speed to get through entire script in 44 seconds
+    total_scrollable_lines = max(1, num_lines - CODE_LINES_PER_SCREEN + 1)
+    lines_per_second = total_scrollable_lines / DURATION_SEC  # Get through all lines in 44 seconds
+    return int(t * lines_per_second) % total_scrollable_lines
+
+
+def led_layer_box(positions: np.ndarray) -> Tuple[int, int, int, int]:
+    """Return the (x0, y0, x1, y1) canvas region covered by the LED grid and colon."""
+    (x_min, y_min), (x_max, y_max) = positions.min(axis=(0, 1)).tolist(), positions.max(axis=(0, 1)).tolist()
+    r = max(LED_RADIUS, COLON_RADIUS)
+    return x_min - r, y_min - r, x_max + r + 1, y_max + r + 1
+
+
+def colon_positions(positions: np.ndarray) -> np.ndarray:
+    """Return a (2, 2) int32 array of the colon dot centers between hour and minute columns (col 1 and 2)."""
+    colon_x = (positions[1, 0, 0] + positions[2, 0, 0]) // 2
+    colon_y_center = GRID_CENTER[1]
+    # Two dots vertically spaced
+    return np.array([(colon_x, colon_y_center - COLON_SPACING // 2),
+                     (colon_x, colon_y_center + COLON_SPACING // 2)], np.int32)
+
+
+def frame_schedule(total_frames: int) -> List[FrameKey]:
+    """Return the (digits, pulse level, colon on) LED state for every frame of the timeline.
+
+    Pulse and colon signals are evaluated for all frames at once as arrays.
+    """
+    frames = np.arange(total_frames)
+    t_arr = frames / FPS
+    levels = quantize_pulse(pulse_factor(t_arr)).tolist()
+    colon = colon_visible(frames).tolist()
+    return [(tuple(digits_for_time(*get_time_for_elapsed(t))), level, colon_on)
+            for t, level, colon_on in zip(t_arr.tolist(), levels, colon)]
+
+
+def _render_led_mask(positions: np.ndarray, box: Tuple[int, int, int, int],
+                     colon_on: bool) -> np.ndarray:
+    """Return a boolean mask of the pixels inside box covered by LEDs (and the colon if on)."""
+    x0, y0, x1, y1 = box
+    mask = np.zeros((y1 - y0, x1 - x0), bool)
+    for cx, cy in positions.reshape(-1, 2) - (x0, y0):
+        blit_led(mask, cx, cy, LED_SPRITE, True)
+    if colon_on:
+        for cx, cy in colon_positions(positions) - (x0, y0):
+            blit_led(mask, cx, cy, COLON_SPRITE, True)
+    return mask
+
+
+def _render_led_layer(positions: np.ndarray, box: Tuple[int, int, int, int],
+                      digits: Tuple[int, ...], k: float, colon_on: bool) -> np.ndarray:
+    """Render the LED grid and colon for one state into a contiguous packed uint32 array covering box."""
+    x0, y0, x1, y1 = box
+    layer = np.empty((y1 - y0, x1 - x0), np.uint32)
+    layer[:] = BACKGROUND_PX
+
+    # Choose base color per LED from its bit, pulse only lit LEDs, clamp once
+    bit_grid = np.array([bcd_bits(d) for d in digits], np.uint8)  # (cols, rows), [8,4,2,1] top->bottom
+    colors = LED_BASE_COLORS[bit_grid]
+    colors[bit_grid == 1] *= max(0.0, min(2.0, k))
+    colors = pack_rgb(np.clip(colors, 0, 255))
+
+    # One disk per LED (column-major, matching bit_grid), plus the colon dots if on
+    centers = positions[:len(digits)].reshape(-1, 2)
+    radii = np.full(len(centers), LED_RADIUS, np.int32)
+    colors = colors.ravel()
+    if colon_on:
+        dots = colon_positions(positions)
+        centers = np.concatenate([centers, dots])
+        radii = np.concatenate([radii, np.full(len(dots), COLON_RADIUS, np.int32)])
+        colors = np.concatenate([colors, pack_rgb([COLON_COLOR] * len(dots))])
+
+    _fill_disks(layer, (centers - np.array([x0, y0], np.int32)).astype(np.int32), radii, colors)
+
+    return layer
+
+
+def build_led_cache(positions: np.ndarray, box: Tuple[int, int, int, int],
+                    keys: Iterable[FrameKey]) -> Dict[FrameKey, np.ndarray]:
+    """Render the LED layer once for every distinct LED state in keys."""
+    return {key: _render_led_layer(positions, box, key[0], pulse_level(key[1]), key[2])
+            for key in keys}
+
+
+def make_renderer(positions: np.ndarray, strip: Optional[np.ndarray], edges: Optional[np.ndarray],
+                  led_cache: Dict[FrameKey, np.ndarray]) -> Callable[..., np.ndarray]:
+    """Return a render(t, digits, level, colon_on, canvas) function over the LED layers in led_cache.
+
+    render draws one frame at time t (seconds) with the given LED state into
+    canvas and returns it: the visible window of the pre-rendered code strip (if
+    any) is copied in first, with its edge rows from edges, then the cached LED layer is composited on top.
+    Everything it touches is bound as a default argument, so the per-frame path
+    only does local lookups instead of module global lookups.
+    """
+    box = led_layer_box(positions)
+    led_masks = {colon_on: _render_led_mask(positions, box, colon_on) for colon_on in (False, True)}
+    num_lines = strip.shape[0] // CODE_LINE_HEIGHT if strip is not None else 0
+    x0, y0, x1, y1 = box
+
+    def render(t: float, digits: Tuple[int, ...], level: int, colon_on: bool, canvas: np.ndarray, *,
+               _bg=BACKGROUND_PX, _strip=strip, _edges=edges, _num_lines=num_lines, _line_h=CODE_LINE_HEIGHT,
+               _lines=CODE_LINES_PER_SCREEN, _max_h=HEIGHT - CODE_START_Y,
+               _code_x=CODE_START_X, _code_y=CODE_START_Y, _scroll_line=code_scroll_line,
+               _led_cache=led_cache, _led_masks=led_masks, _x0=x0, _y0=y0, _x1=x1, _y1=y1,
+               _copyto=np.copyto) -> np.ndarray:
+        canvas[:] = _bg
+
+        # Draw scrolling code overlay first (background layer)
+        if _strip is not None:
+            first = _scroll_line(t, _num_lines)
+            last = min(first + _lines, _num_lines) - 1
+            code = canvas[_code_y:, _code_x:]
+            window = _strip[first * _line_h:(last + 1) * _line_h][:_max_h]
+            _copyto(code[:len(window)], window)
+            # The window's first rows also hold the overhang of the line above it, and
+            # the last line overhangs past the window: use both edges as drawn alone
+            head = _edges[first, 0][:_max_h]
+            _copyto(code[:len(head)], head)
+            tail = code[(last + 1 - first) * _line_h:][:_edges.shape[2]]
+            _copyto(tail, _edges[last, 1][:len(tail)])
+
+        _copyto(canvas[_y0:_y1, _x0:_x1], _led_cache[digits, level, colon_on], where=_led_masks[colon_on])
+        return canvas
+
+    return render
+
+
+# ----------------------------
+# Parallel Rendering
+# ----------------------------
+RENDER_CHUNK = 16  # most distinct frames rendered per worker task
+FRAME_POOL_BYTES = 128 * 1024 * 1024  # memory budget for rendered frames in flight, whatever the core count
+
+# Per-process render state, populated once by _init_worker
+_worker_state = {}
+
 
-    # Draw scrolling code overlay first (background layer)
-    draw_code_overlay(draw, source_lines, t)
+def _init_worker(positions: np.ndarray, strip: Optional[np.ndarray], edges: Optional[np.ndarray],
+                 led_cache: Dict[FrameKey, np.ndarray], pool_name: Optional[str], pool_shape: Tuple[int, ...]):
+    """Process pool initializer: build the frame renderer and attach the frame pool once per worker."""
+    _worker_state["render"] = make_renderer(positions, strip, edges, led_cache)
+    if pool_name is not None:
+        shm = shared_memory.SharedMemory(name=pool_name)
+        _worker_state["pool_shm"] = shm  # keep the mapping alive
+        _worker_state["pool"] = np.ndarray(pool_shape, np.uint32, buffer=shm.buf)
 
-    # Compute pulsing factor
-    k = pulse_factor(t)
 
-    # For each digit column
-    for col_idx, d in enumerate(digits):
-        bits = bcd_bits(d)  # [8,4,2,1] top->bottom
-        for row_idx, bit in enumerate(bits):
-            cx, cy = positions[col_idx][row_idx]
-            # Choose base color based on bit
-            base_color = LED_ON if bit else LED_OFF
-            color = modulate_brightness(base_color, k if bit else 1.0)  # pulse only lit LEDs
-            draw_led(draw, cx, cy, LED_RADIUS, color)
+def _render_chunk(slot: Optional[int], frames: List[Tuple[int, FrameKey]]) -> Union[int, np.ndarray]:
+    """Render (frame index, LED state) pairs into consecutive entries of pool slot `slot`; return the count.
 
-    # Draw blinking colon between hour and minute columns (col 1 and 2)
-    if colon_visible(t):
-        # Position colon between columns 1 and 2
-        colon_x = (positions[1][0][0] + positions[2][0][0]) // 2
-        colon_y_center = GRID_CENTER[1]
-        # Draw two dots vertically spaced
-        colon_y1 = colon_y_center - COLON_SPACING // 2
-        colon_y2 = colon_y_center + COLON_SPACING // 2
-        draw_led(draw, colon_x, colon_y1, COLON_RADIUS, COLON_COLOR)
-        draw_led(draw, colon_x, colon_y2, COLON_RADIUS, COLON_COLOR)
+    Without a shared frame pool (slot None) the frames are rendered into a new
+    array that is returned to the caller instead.
+    """
+    render = _worker_state["render"]
+    if slot is None:
+        out = np.empty((len(frames), HEIGHT, WIDTH), np.uint32)
+    else:
+        out = _worker_state["pool"][slot]
+    for j, (i, (digits, level, colon_on)) in enumerate(frames):
+        render(i / FPS, digits, level, colon_on, out[j])
+    return out if slot is None else len(frames)
 
-    return img
+
+def _create_frame_pool(size: int) -> Optional[shared_memory.SharedMemory]:
+    """Create a shared-memory segment of `size` bytes, or return None if the system can't provide it."""
+    try:
+        # /dev/shm pages are only allocated on first write, so an undersized
+        # tmpfs would kill a worker with SIGBUS rather than fail here
+        if os.path.isdir("/dev/shm") and shutil.disk_usage("/dev/shm").free < size:
+            return None
+        return shared_memory.SharedMemory(create=True, size=size)
+    except OSError:
+        return None
+
+
+def frame_runs(schedule: List[FrameKey], strip: Optional[np.ndarray]) -> List[Tuple[int, int]]:
+    """Group consecutive identical frames into (first frame index, repeat count) runs.
+
+    A frame is fully determined by its LED state and the first visible code line,
+    so only the first frame of each run needs rendering.
+    """
+    num_lines = strip.shape[0] // CODE_LINE_HEIGHT if strip is not None else 0
+    runs = []
+    prev = None
+    for i, key in enumerate(schedule):
+        frame = (key, code_scroll_line(i / FPS, num_lines) if strip is not None else 0)
+        if frame == prev:
+            runs[-1][1] += 1
+        else:
+            runs.append([i, 1])
+            prev = frame
+    return [(i, repeat) for i, repeat in runs]
+
+
+def render_frames(positions: np.ndarray, strip: Optional[np.ndarray], edges: Optional[np.ndarray],
+                  schedule: List[FrameKey], write: Callable[[np.ndarray], object]):
+    """Render all frames in parallel by a pool of worker processes and pass them to write in order.
+
+    Only the first frame of each run of identical frames is rendered; it is
+    passed to write once per repeat. Workers render straight into a fixed pool
+    of shared-memory frame slots that is allocated once, so frames are neither
+    allocated nor pickled per chunk; if shared memory is unavailable, chunks
+    are returned pickled instead. The array passed to write is only valid
+    until write returns.
+    """
+    runs = frame_runs(schedule, strip)
+
+    workers = max(1, (os.cpu_count() or 2) - 1)  # leave a core for the encoder
+    # Bound the frames in flight by FRAME_POOL_BYTES so finished frames don't
+    # pile up in memory when the encoder is slower than the workers: about one
+    # chunk per worker plus the one being written, shrinking chunks (and, on
+    # many cores, the number of chunks) to stay in budget
+    budget_frames = max(2, FRAME_POOL_BYTES // (HEIGHT * WIDTH * 4))
+    slots = max(2, min(workers + 1, budget_frames))
+    chunk_size = max(1, min(RENDER_CHUNK, budget_frames // slots))
+    pool_shape = (slots, chunk_size, HEIGHT, WIDTH)
+    # Render the LED layers once here; forked workers share them copy-on-write
+    # instead of each building its own copy
+    led_cache = build_led_cache(positions, led_layer_box(positions), set(schedule))
+    # Fall back to returning pickled chunks if shared memory is unavailable
+    shm = _create_frame_pool(int(np.prod(pool_shape)) * 4)
+    pool = np.ndarray(pool_shape, np.uint32, buffer=shm.buf) if shm is not None else None
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(positions, strip, edges, led_cache,
+                                           shm.name if shm is not None else None, pool_shape)) as ex:
+            pending = deque()
+
+            def drain_oldest():
+                slot, chunk, future = pending.popleft()
+                result = future.result()
+                for frame, (_, repeat) in zip(pool[slot] if pool is not None else result, chunk):
+                    for _ in range(repeat):
+                        write(frame)
+
+            for chunk_idx, start in enumerate(range(0, len(runs), chunk_size)):
+                slot = chunk_idx % slots
+                if len(pending) == slots:
+                    drain_oldest()  # frees `slot`
+                chunk = runs[start:start + chunk_size]
+                frames = [(i, schedule[i]) for i, _ in chunk]
+                pending.append((slot, chunk, ex.submit(_render_chunk, slot if pool is not None else None, frames)))
+            while pending:
+                drain_oldest()
+    finally:
+        del pool
+        if shm is not None:
+            shm.close()
+            shm.unlink()
 
 
 # ----------------------------
 # Main: Write MP4
 # ----------------------------
+def pick_h264_encoder(ffmpeg: str) -> Tuple[str, List[str]]:
+    """Return (name, args) of the first H.264 encoder in H264_ENCODERS that works on this machine."""
+    listed = subprocess.run([ffmpeg, "-hide_banner", "-encoders"], capture_output=True, text=True).stdout
+    for name, args in H264_ENCODERS:
+        if VIDEO_ENCODER and name != VIDEO_ENCODER:
+            continue
+        if f" {name} " not in listed:
+            continue
+        # Hardware encoders can be compiled in without a usable device, so try encoding one frame
+        probe = [
+            ffmpeg, "-hide_banner", "-v", "error",
+            "-f", "lavfi", "-i", f"color=black:s={WIDTH}x{HEIGHT}:r={FPS}", "-frames:v", "1",
+            "-c:v", name, *args, "-f", "null", "-",
+        ]
+        try:
+            if subprocess.run(probe, capture_output=True, timeout=30).returncode == 0:
+                return name, args
+        except subprocess.TimeoutExpired:
+            pass
+    raise RuntimeError(f"No usable H.264 encoder found (tried {VIDEO_ENCODER or 'all of H264_ENCODERS'})")
+
+
+def open_ffmpeg() -> subprocess.Popen:
+    """Start an ffmpeg process that encodes raw rgba frames piped to its stdin."""
+    ffmpeg = imageio_ffmpeg.get_ffmpeg_exe()
+    encoder, encoder_args = pick_h264_encoder(ffmpeg)
+    print(f"Encoding with {encoder}")
+    cmd = [
+        ffmpeg, "-y", "-v", "warning",
+        "-f", "rawvideo", "-pix_fmt", "rgba", "-s", f"{WIDTH}x{HEIGHT}", "-r", str(FPS), "-i", "-",
+        "-an", "-c:v", encoder, *encoder_args,
+        OUTPUT_MP4,
+    ]
+    return subprocess.Popen(cmd, stdin=subprocess.PIPE, bufsize=4 * 1024 * 1024)
+
+
 def main_mp4():
     positions = compute_grid_positions()
-    source_lines = load_source_code()
+    source, line_offsets = load_source_code()
+
+    # Text never changes between frames, so rasterize it once and scroll through it
+    strip = edges = None
+    try:
+        if CODE_OVERLAY_ENABLED and len(line_offsets) > 1:
+            strip, edges = rasterize_code_strip(source, line_offsets, get_font())
+    finally:
+        if isinstance(source, mmap.mmap):
+            source.close()  # not needed past here; don't hand the mapping to the forked workers
 
     total_frames = DURATION_SEC * FPS
-    writer = imageio.get_writer(OUTPUT_MP4, fps=FPS, codec="libx264", quality=8)
+    schedule = frame_schedule(total_frames)
+    proc = open_ffmpeg()
+
+    def write_frame(frame_arr: np.ndarray):
+        # ffmpeg reads rgba as-is, so each frame must be exactly one packed, contiguous buffer
+        assert frame_arr.dtype == np.uint32 and frame_arr.shape == (HEIGHT, WIDTH)
+        assert frame_arr.flags['C_CONTIGUOUS']
+        proc.stdin.write(frame_arr.data)
 
+    broken_pipe = False
     try:
-        for i in range(total_frames):
-            t = i / FPS
-            frame_img = render_frame(t, positions, source_lines)
-            # Convert PIL Image to numpy array
-            frame_arr = np.array(frame_img)
-            writer.append_data(frame_arr)
+        # Frames are rendered by worker processes; only the encoder runs here
+        render_frames(positions, strip, edges, schedule, write_frame)
+    except BrokenPipeError:
+        broken_pipe = True  # ffmpeg exited early; its exit status is reported below
     finally:
-        writer.close()
+        try:
+            proc.stdin.close()
+        except BrokenPipeError:
+            broken_pipe = True
+        proc.wait()
+    if broken_pipe or proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg exited {'early ' if broken_pipe else ''}with status {proc.returncode}")
 
     print(f"Saved: {OUTPUT_MP4}")
 